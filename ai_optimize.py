@@ -6,7 +6,7 @@ Usage:
 from __future__ import annotations
 import argparse
 import os
-import pandas as pd
+import sys
 try:
     from dotenv import load_dotenv  # type: ignore
 except Exception:  # pragma: no cover
@@ -14,7 +14,9 @@ except Exception:  # pragma: no cover
         return False
 from backtesting import Backtest
 from src.strategy.divergent_bar import DivergentBar
+from src.utils.csv_loader import read_csv
 from src.strategy.strategy_ai import (
+    dumps,
     extract_context,
     build_llm_prompt,
     send_prompt_openai,
@@ -31,6 +33,8 @@ def main():
     p.add_argument("--commission", type=float, default=0.002)
     p.add_argument("--no-llm", action="store_true", help="Only print prompt & diagnostics; skip LLM call")
     p.add_argument("--suggestions-json", help="Write parsed suggestions JSON to file (if LLM call succeeds)")
+    p.add_argument("--diagnostics-out", default="results/condition_diagnostics.json",
+                   help="Condition diagnostics JSON output path")
     args = p.parse_args()
 
     if not os.path.exists(args.data):
@@ -39,9 +43,11 @@ def main():
     # Load environment variables from .env if present
     load_dotenv()
 
-    df = pd.read_csv(args.data, parse_dates=True, index_col='Date')
-    bt = Backtest(df, DivergentBar, cash=args.cash, commission=args.commission, finalize_trades=True)
-    stats = bt.run()
+    df = read_csv(args.data, index_col='Date')
+    bt = Backtest(df, DivergentBar, cash=args.cash, commission=args.commission,
+                  exclusive_orders=True, finalize_trades=True)
+    # store_conditions keeps the per-condition matrix for build_condition_diagnostics
+    stats = bt.run(store_conditions=True)
     # Mirror backtest.py output
     print("\n=== Backtest Stats ===")
     print(stats)
@@ -59,15 +65,23 @@ def main():
 
     # Extract base context (winners/losers/performance) and condition diagnostics
     ctx = extract_context(stats)
-    diagnostics = build_condition_diagnostics(bt)
-    prompt = build_llm_prompt(ctx)
+    # stats._strategy is the run's strategy instance holding _cond_matrix
+    diagnostics = build_condition_diagnostics(stats)
+    parts = [build_llm_prompt(ctx)]
     if diagnostics:
-        import json
-        prompt += "\n\nCONDITION_DIAGNOSTICS_JSON:\n" + json.dumps(diagnostics, indent=2)
+        # Full diagnostics go to a sidecar file; the prompt gets one line per condition
+        os.makedirs(os.path.dirname(args.diagnostics_out) or '.', exist_ok=True)
+        with open(args.diagnostics_out, 'w') as f:
+            f.write(dumps(diagnostics))
+        print(f"Condition diagnostics written to {args.diagnostics_out}")
+        parts.append("\n\nCONDITION_DIAGNOSTICS (condition: pass_rate, signal_rate_given_pass):\n")
+        parts.append("\n".join(
+            f"{d['condition']}: {d['pass_rate']:.4f}, {d['signal_rate_given_pass']:.4f}"
+            for d in diagnostics
+        ))
+    prompt = "".join(parts)
 
-    print("\n==== Prompt Sent ====")
-    print(prompt)
-    print("====================\n")
+    sys.stdout.write("".join(["\n==== Prompt Sent ====\n", prompt, "\n====================\n\n"]))
 
     if args.no_llm:
         print("--no-llm specified: skipping model call.")
@@ -84,8 +98,8 @@ def main():
         print(f"{i}. {s.get('change','')}\n   Rationale: {s.get('rationale','')}\n   Hint: {s.get('implementation_hint','')}")
     if args.suggestions_json:
         try:
-            import json, pathlib
-            pathlib.Path(args.suggestions_json).write_text(json.dumps(suggestions, indent=2))
+            with open(args.suggestions_json, 'w') as f:
+                f.write(dumps(suggestions))
             print(f"Suggestions written to {args.suggestions_json}")
         except Exception as e:
             print(f"Failed to write suggestions JSON: {e}")
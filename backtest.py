@@ -1,32 +1,47 @@
 
 # Example OHLC daily data for Google Inc.
-import pandas as pd
-from backtesting import Backtest
-import sys
+import argparse
 import os
+from backtesting import Backtest
 from src.strategy.sma import SmaCross, SMA
 from src.strategy.divergent_bar import DivergentBar
+from src.utils.csv_loader import read_csv
 
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python backtest.py <filename>")
-        sys.exit(1)
-    filename = sys.argv[1]
-    input_data = pd.read_csv(filename, parse_dates=True, index_col='Date')
-    bt = Backtest(input_data, DivergentBar, cash=10_000, commission=.002, finalize_trades=True)
+    parser = argparse.ArgumentParser(description="Backtest the DivergentBar strategy on an OHLC CSV file.")
+    parser.add_argument("filename", help="CSV file with Date index & OHLC columns")
+    parser.add_argument("--plot", action="store_true", help="Open the interactive Bokeh plot")
+    parser.add_argument("--print-trades", action="store_true", help="Print the full trade table")
+    parser.add_argument("--trades-out", default="results/trades.parquet",
+                        help="Trade table output path (Parquet; falls back to CSV without a parquet engine)")
+    args = parser.parse_args()
+
+    input_data = read_csv(args.filename, index_col='Date')
+    bt = Backtest(input_data, DivergentBar, cash=10_000, commission=.002,
+                  exclusive_orders=True, finalize_trades=True)
     stats = bt.run()
     print(stats)
     columns = [
         'Size', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice', 'SL', 'TP',
         'PnL', 'Commission', 'ReturnPct', 'Entry_DivergentBar', 'Exit_DivergentBar'
     ]
-    print(stats['_trades'][columns].to_string())
-    with open("results/trades_output.txt", "w") as f:
-        f.write(stats['_trades'][columns].to_string())
+    trades = stats['_trades'][columns]
+    if args.print_trades:
+        print(trades.to_string())
+
+    os.makedirs(os.path.dirname(args.trades_out) or '.', exist_ok=True)
+    try:
+        trades.to_parquet(args.trades_out)
+        print(f"Trades written to {args.trades_out}")
+    except ImportError:
+        csv_path = os.path.splitext(args.trades_out)[0] + '.csv'
+        trades.to_csv(csv_path)
+        print(f"Trades written to {csv_path}")
 
-    bt.plot()
+    if args.plot:
+        bt.plot()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
 import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
+from src.utils.csv_loader import read_csv
 
 # Entry condition: volume spike + bullish candle
 def filtered_entry_signal(df, volume_threshold=1.0):
@@ -9,55 +12,53 @@ def filtered_entry_signal(df, volume_threshold=1.0):
 
 # Backtest logic with next-day open entry, TP, trailing stop, and 3-day hold
 def backtest_with_details(df, signal_mask, hold_days=3, tp_pct=0.03, trailing_pct=0.005):
+    if hold_days < 0:
+        raise ValueError(f"hold_days must be >= 0, got {hold_days}")
     df = df.reset_index(drop=True)
-    df['Entry'] = None
-    df['Exit'] = None
-    df['PnL'] = None
-    df['Outcome'] = None
+    n = len(df)
 
-    for i in range(len(df) - hold_days - 1):  # ensure room for next-day open and hold_days
-        if signal_mask[i]:
-            if pd.isna(df.at[i + 1, 'Open']):
-                continue
-            entry_date = df.at[i + 1, 'Date']
-            entry_price = df.at[i + 1, 'Open']
-            take_profit = entry_price * (1 + tp_pct)
-            trailing_stop = entry_price * (1 - trailing_pct)
-            max_price = entry_price
-            outcome = 'HOLD'
-            exit_price = entry_price
+    # Signal bars with room for next-day open entry and hold_days (same bound as the scalar loop)
+    signal = np.asarray(signal_mask, dtype=bool)[:max(n - hold_days - 1, 0)]
+    opens = df['Open'].to_numpy(dtype=float)
+    idx = np.flatnonzero(signal)
+    idx = idx[~np.isnan(opens[idx + 1])]
+    entry_price = opens[idx + 1]
 
-            for j in range(1, hold_days + 1):
-                idx = i + 1 + j
-                if idx >= len(df):
-                    break
-                high = df.at[idx, 'High']
-                low = df.at[idx, 'Low']
-                close = df.at[idx, 'Close']
+    if hold_days == 0:
+        # No bars to hold: every trade is a HOLD exiting at its entry price
+        is_tp = is_trail = np.zeros(len(idx), dtype=bool)
+        exit_price = entry_price
+    else:
+        # (n_trades, hold_days) blocks of the bars following each entry bar
+        bars = idx[:, None] + 2 + np.arange(hold_days)
+        H = df['High'].to_numpy(dtype=float)[bars]
+        L = df['Low'].to_numpy(dtype=float)[bars]
+        C = df['Close'].to_numpy(dtype=float)[bars]
 
-                max_price = max(max_price, high)
-                trailing_stop = max(trailing_stop, max_price * (1 - trailing_pct))
+        take_profit = entry_price * (1 + tp_pct)
+        # Running max of [entry, highs...] gives the trailing stop in one pass, since the
+        # stop only ratchets up with it; fmax skips NaN highs like the scalar max() did
+        max_price = np.fmax.accumulate(np.concatenate([entry_price[:, None], H], axis=1), axis=1)[:, 1:]
+        trailing_stop = max_price * (1 - trailing_pct)
 
-                if high >= take_profit:
-                    outcome = 'TP'
-                    exit_price = take_profit
-                    break
-                elif low <= trailing_stop:
-                    outcome = 'TRAIL_STOP'
-                    exit_price = trailing_stop
-                    break
-                elif j == hold_days:
-                    outcome = 'HOLD'
-                    exit_price = close
+        tp_hit = H >= take_profit[:, None]
+        trail_hit = L <= trailing_stop
+        event = tp_hit | trail_hit
+        first_event = np.argmax(event, axis=1)
+        has_event = event.any(axis=1)
+        rows = np.arange(len(idx))
+        is_tp = has_event & tp_hit[rows, first_event]
+        is_trail = has_event & ~is_tp
 
-            pnl = round(exit_price - entry_price, 2)
-            df.at[i + 1, 'Entry'] = entry_price
-            df.at[i + 1, 'Exit'] = exit_price
-            df.at[i + 1, 'PnL'] = pnl
-            df.at[i + 1, 'Outcome'] = outcome
+        exit_price = np.where(is_tp, take_profit, np.where(is_trail, trailing_stop[rows, first_event], C[:, -1]))
 
-    df.dropna(subset=['Entry'], inplace=True)
-    return df
+    # Trade rows are the entry bars; slice them directly (labels = entry bar index)
+    return df.iloc[idx + 1].assign(
+        Entry=entry_price,
+        Exit=exit_price,
+        PnL=np.round(exit_price - entry_price, 2),
+        Outcome=np.where(is_tp, 'TP', np.where(is_trail, 'TRAIL_STOP', 'HOLD')),
+    )
 
 def clean_and_prepare(df):
     df.columns = [str(c).strip().capitalize() for c in df.columns]
@@ -71,34 +72,57 @@ def clean_and_prepare(df):
     df.reset_index(drop=True, inplace=True)
     return df
 
-def batch_test(input_dir, output_dir):
+def _process_file(input_path):
+    """
+    Single-file pipeline for batch_test, run in a worker process.
+    Returns (result, None) on success or (None, error message) on failure.
+    """
+    try:
+        df = read_csv(input_path)
+        df = clean_and_prepare(df)
+        signal = filtered_entry_signal(df, volume_threshold=1.1)
+        return backtest_with_details(df, signal), None
+    except Exception as e:
+        return None, str(e)
+
+def batch_test(input_dir, output_dir, max_workers=None):
     """
     Run batch backtesting on all CSV files in input_dir, collect results, and save combined results to output_dir.
-    Prints summary for each file.
+    Files are processed in parallel across max_workers processes (default: one per CPU).
+    Prints and saves a per-symbol summary (trade count, cumulative PnL).
     """
     os.makedirs(output_dir, exist_ok=True)
+    fnames = [f for f in os.listdir(input_dir) if f.lower().endswith('.csv')]
+    paths = [os.path.join(input_dir, f) for f in fnames]
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (4 * workers))
     combined_results = []
-    for fname in os.listdir(input_dir):
-        if fname.lower().endswith('.csv'):
-            input_path = os.path.join(input_dir, fname)
-            try:
-                df = pd.read_csv(input_path)
-                df = clean_and_prepare(df)
-                signal = filtered_entry_signal(df, volume_threshold=1.1)
-                result = backtest_with_details(df, signal)
-                symbol = os.path.splitext(fname)[0]
-                result['Symbol'] = symbol
-                combined_results.append(result)
-                print(f"{symbol}: Total Trades={len(result)}, Cumulative PnL={round(result['PnL'].sum(), 2) if not result.empty else 0.0}")
-            except Exception as e:
-                print(f"Error processing {fname}: {e}")
+    symbols = []
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for fname, (result, error) in zip(fnames, ex.map(_process_file, paths, chunksize=chunksize)):
+            if error is not None:
+                print(f"Error processing {fname}: {error}")
+                continue
+            symbol = os.path.splitext(fname)[0]
+            result['Symbol'] = symbol
+            combined_results.append(result)
+            symbols.append(symbol)
     if combined_results:
         final_df = pd.concat(combined_results, ignore_index=True)
         final_df.to_csv(os.path.join(output_dir, "combined_results.csv"), index=False)
+        # Reindex so files without trades still show up with zeros
+        summary = (
+            final_df.groupby('Symbol', sort=False)
+            .agg(total_trades=('PnL', 'size'), cumulative_PnL=('PnL', 'sum'))
+            .reindex(symbols, fill_value=0)
+            .round({'cumulative_PnL': 2})
+        )
+        print(summary.to_string())
+        summary.to_csv(os.path.join(output_dir, "summary.csv"))
 
 
 def main(input_file, output_file):
-    df = pd.read_csv(input_file)
+    df = read_csv(input_file)
     df = clean_and_prepare(df)
     signal = filtered_entry_signal(df, volume_threshold=1.1)
     result = backtest_with_details(df, signal)
@@ -117,13 +141,14 @@ if __name__ == "__main__":
     parser.add_argument("--batch", action="store_true", help="Run batch mode on input_dir/output_dir")
     parser.add_argument("--input_dir", type=str, default=None, help="Directory containing input CSV files for batch mode")
     parser.add_argument("--output_dir", type=str, default=None, help="Directory to save output CSV files for batch mode")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for batch mode (default: CPU count)")
     args = parser.parse_args()
 
     if args.batch:
         if not args.input_dir or not args.output_dir:
             print("Batch mode requires --input_dir and --output_dir.")
         else:
-            batch_test(args.input_dir, args.output_dir)
+            batch_test(args.input_dir, args.output_dir, max_workers=args.workers)
     else:
         if not args.input or not args.output:
             print("Single file mode requires input and output file arguments.")
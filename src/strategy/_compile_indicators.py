@@ -0,0 +1,41 @@
+"""Ahead-of-time build of the divergent bar kernel with numba.pycc.
+
+Produces the `_divergent_native` extension next to this file so processes
+(e.g. sweep / optimize workers) load compiled code instead of paying the
+numba JIT on first call. Build once after installing requirements:
+
+    python -m src.strategy._compile_indicators
+
+divergent_bar imports the extension when present and otherwise falls back to
+the njit kernel (or the numexpr / numpy paths without numba). The build also
+exports a hash of `_divergent_loop`'s source; divergent_bar ignores a build
+whose hash no longer matches, so rebuild after changing the kernel.
+numba.pycc is deprecated upstream; if it is removed, the JIT path keeps
+working unchanged.
+"""
+from __future__ import annotations
+import os
+from numba.pycc import CC  # type: ignore
+from src.strategy.divergent_bar import _divergent_loop, _kernel_hash
+
+cc = CC('_divergent_native')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Eight float64 inputs (OHLC, Jaw/Teeth/Lips, AO), int8 output, as _divergent_signal passes them
+cc.export(
+    'divergent_loop',
+    'i1[:](f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], i1[:])'
+)(getattr(_divergent_loop, 'py_func', _divergent_loop))
+
+# Frozen into the build as a constant; divergent_bar._load_native compares it
+_KERNEL_HASH = _kernel_hash()
+
+
+@cc.export('kernel_hash', 'i8()')
+def kernel_hash():
+    return _KERNEL_HASH
+
+
+if __name__ == "__main__":
+    cc.compile()
+    print(f"Built {cc.name} in {cc.output_dir}")
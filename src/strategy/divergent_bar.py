@@ -1,56 +1,381 @@
+import functools
+import hashlib
+import importlib
+import inspect
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
-from backtesting import Strategy
-from backtesting.lib import crossover, TrailingStrategy
+from backtesting.lib import TrailingStrategy
+from src.utils._njit import NUMBA_AVAILABLE, njit
+try:
+    # Optional import; the no-numba signal path falls back to numpy boolean ops
+    import numexpr  # type: ignore
+except Exception:  # pragma: no cover - absence handled gracefully
+    numexpr = None  # sentinel
+try:
+    # Optional import; used by _smas only when USE_TALIB is set
+    import talib  # type: ignore
+except Exception:  # pragma: no cover - absence handled gracefully
+    talib = None  # sentinel
 
 
+# Indicator outputs keyed by function name, SMA backend and input contents, so
+# repeated Backtest.run()/optimize() calls on the same data skip recomputation.
+_INDICATOR_CACHE_SIZE = 32
+_indicator_cache = OrderedDict()
+
+
+def _digest(values):
+    """Content hash of an array, used as an indicator cache key."""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    return hashlib.blake2b(values.view(np.uint8), digest_size=16).digest()
+
+
+def _memoize(func):
+    """LRU-memoize a pure indicator function of numpy arrays.
+    Callers receive copies so cached results are never mutated."""
+    @functools.wraps(func)
+    def wrapper(*arrays):
+        key = (func.__name__, USE_TALIB and talib is not None) + tuple(_digest(a) for a in arrays)
+        try:
+            result = _indicator_cache[key]
+            _indicator_cache.move_to_end(key)
+        except KeyError:
+            result = _indicator_cache[key] = func(*arrays)
+            if len(_indicator_cache) > _INDICATOR_CACHE_SIZE:
+                _indicator_cache.popitem(last=False)
+        if isinstance(result, tuple):
+            return tuple(r.copy() for r in result)
+        return result.copy()
+    return wrapper
+
+
+_SMA_BLOCK = 1_000_000
+# Opt in to TA-Lib's SMA (when installed) for AO and the Alligator. Off by
+# default so results do not depend on whether TA-Lib is installed: its sums
+# round differently and flip the signal on exact ties (see _smas).
+USE_TALIB = False
+
+
+def _smas(values, windows):
+    """Running-sum simple moving averages of one series, one per window, sharing
+    a single cumulative sum; NaN for the first window-1 bars of each.
+    Like rolling().mean(), a NaN input only voids the windows containing it.
+    The cumulative sum restarts every _SMA_BLOCK bars to bound rounding drift.
+    Results agree with rolling().mean() to a few ulps, so a comparison that is
+    an exact tie in real numbers (common with cent-rounded prices) can resolve
+    either way; such bars are the only accepted signal differences.
+    Uses TA-Lib's SMA when USE_TALIB is set, TA-Lib is installed and the input
+    has no NaN (TA-Lib would carry a NaN into every later bar)."""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    n = len(values)
+    if USE_TALIB and talib is not None and 2 <= min(windows) and max(windows) <= n and not np.isnan(values).any():
+        return [talib.SMA(values, timeperiod=w) for w in windows]
+    outs = [np.full(values.shape, np.nan) for _ in windows]
+    longest = max(windows)
+    for start in range(min(windows) - 1, n, _SMA_BLOCK):
+        stop = min(start + _SMA_BLOCK, n)
+        # cs[j] is the sum of values[base:base + j]
+        base = max(start - longest + 1, 0)
+        block = values[base:stop]
+        nan = np.isnan(block)
+        cs = np.concatenate(([0.0], np.cumsum(np.where(nan, 0.0, block))))
+        nan_count = np.concatenate(([0], np.cumsum(nan))) if nan.any() else None
+        for out, window in zip(outs, windows):
+            first = max(start, window - 1)
+            if first >= stop:
+                continue
+            hi = slice(first - base + 1, stop - base + 1)
+            lo = slice(first - base + 1 - window, stop - base + 1 - window)
+            out[first:stop] = (cs[hi] - cs[lo]) / window
+            if nan_count is not None:
+                out[first:stop][nan_count[hi] > nan_count[lo]] = np.nan
+    return outs
+
+
+def _shift(values, k):
+    """Shift forward by k bars, padding the front with NaN."""
+    out = np.full(values.shape, np.nan)
+    if k < len(values):
+        out[k:] = values[:len(values) - k]
+    return out
+
+
+# fastmath minus 'nnan'/'ninf': the loop relies on NaN comparisons being False
+# to emit 0 during the indicator warm-up.
+@njit(cache=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'})
+def _divergent_loop(open_, high, low, close, jaw, teeth, lips, ao, out):
+    """Single pass over the bars writing 1 / -1 / 0 divergent signals into `out`."""
+    for i in range(3, len(close)):
+        min_alligator = min(jaw[i], teeth[i], lips[i])
+        max_alligator = max(jaw[i], teeth[i], lips[i])
+        mid = (high[i] + low[i]) / 2
+        if not (high[i] < min_alligator or low[i] > max_alligator):
+            out[i] = 0
+        elif (close[i] > mid and ao[i] < ao[i - 1] and open_[i] < close[i]
+              and low[i] < min(low[i - 1], low[i - 2], low[i - 3])):
+            out[i] = 1
+        elif (close[i] < mid and ao[i] > ao[i - 1] and open_[i] > close[i]
+              and high[i] > max(high[i - 1], high[i - 2], high[i - 3])):
+            out[i] = -1
+        else:
+            out[i] = 0
+    return out
+
+
+def _kernel_hash():
+    """int64 hash of _divergent_loop's source, stored in the AOT build."""
+    source = inspect.getsource(getattr(_divergent_loop, 'py_func', _divergent_loop))
+    return int.from_bytes(hashlib.blake2b(source.encode(), digest_size=8).digest(), 'little', signed=True)
+
+
+def _load_native():
+    """divergent_loop from the optional AOT build (see _compile_indicators),
+    or None when it is absent or was built from a different _divergent_loop."""
+    try:
+        native = importlib.import_module('src.strategy._divergent_native')
+        if native.kernel_hash() != _kernel_hash():
+            return None  # stale build: rerun _compile_indicators
+        return native.divergent_loop
+    except Exception:  # absent, unloadable or built without kernel_hash
+        return None
+
+
+# Skips the JIT in fresh processes (e.g. sweep / optimize workers)
+_native_divergent_loop = _load_native()
+
+
+@_memoize
+def _awesome_oscillator(high, low):
+    median_price = (np.asarray(high, dtype=float) + np.asarray(low, dtype=float)) / 2
+    fast, slow = _smas(median_price, (5, 34))
+    return fast - slow
+
+
+@_memoize
+def _alligator_lines(close):
+    sma13, sma8, sma5 = _smas(close, (13, 8, 5))
+    jaw = _shift(sma13, 8)
+    teeth = _shift(sma8, 5)
+    lips = _shift(sma5, 3)
+    return jaw, teeth, lips
+
+
+@_memoize
+def _divergent_signal(open_, high, low, close, jaw, teeth, lips, ao):
+    arrays = [np.ascontiguousarray(a, dtype=np.float64)
+              for a in (open_, high, low, close, jaw, teeth, lips, ao)]
+    loop = _native_divergent_loop if _native_divergent_loop is not None else _divergent_loop
+    return loop(*arrays, np.zeros(len(close), dtype=np.int8))
+
+
+def _prior_extreme(values, reduce, bars=3):
+    """reduce (np.fmin / np.fmax) of the previous `bars` values for bars
+    `bars`..N-1, folded from zero-copy slices into one buffer."""
+    n = len(values)
+    out = reduce(values[bars - 1:n - 1], values[bars - 2:n - 2])
+    for k in range(3, bars + 1):
+        reduce(out, values[bars - k:n - k], out=out)
+    return out
+
+
+def _alligator_bounds(jaw, teeth, lips):
+    """Elementwise min / max of the Jaw, Teeth and Lips ndarrays, folded in
+    place. fmin/fmax skip NaN like DataFrame.min/max(axis=1) did during the
+    warm-up, where np.minimum.reduce would propagate it."""
+    min_alligator = np.fmin(jaw, teeth)
+    np.fmin(min_alligator, lips, out=min_alligator)
+    max_alligator = np.fmax(jaw, teeth)
+    np.fmax(max_alligator, lips, out=max_alligator)
+    return min_alligator, max_alligator
+
+
+def _divergent_conditions(open_, high, low, close, jaw, teeth, lips, ao):
+    """Vectorized divergent bar conditions: (signal, {condition name: bool array})."""
+    open_, high, low, close, jaw, teeth, lips, ao = (
+        np.asarray(a, dtype=float) for a in (open_, high, low, close, jaw, teeth, lips, ao)
+    )
+    min_alligator, max_alligator = _alligator_bounds(jaw, teeth, lips)
+    mid = (high + low) / 2
+    upper_half = close > mid
+    lower_half = close < mid
+    # Bars without three prior bars (or a prior AO) fail the lookback tests
+    local_min = np.zeros(len(close), dtype=bool)
+    local_min[3:] = low[3:] < _prior_extreme(low, np.fmin)
+    local_max = np.zeros(len(close), dtype=bool)
+    local_max[3:] = high[3:] > _prior_extreme(high, np.fmax)
+    # Bar does not cross any alligator line
+    no_cross = (
+        (high < min_alligator) | (low > max_alligator)
+    )
+    ao_down = np.zeros(len(close), dtype=bool)
+    ao_down[1:] = ao[1:] < ao[:-1]
+    ao_up = np.zeros(len(close), dtype=bool)
+    ao_up[1:] = ao[1:] > ao[:-1]
+    bullish = upper_half & ao_down & local_min & (open_ < close) & no_cross
+    bearish = lower_half & ao_up & local_max & (open_ > close) & no_cross
+    result = bullish.astype(np.int8) - bearish.astype(np.int8)
+    conditions = {
+        'upper_half': upper_half,
+        'lower_half': lower_half,
+        'local_min': local_min,
+        'local_max': local_max,
+        'ao_down': ao_down,
+        'ao_up': ao_up,
+        'no_cross': no_cross,
+    }
+    return result, conditions
+
+
+# Bullish / bearish predicates over bars 3..N-1 for numexpr: h/l/o/c/ao are
+# the bar itself, suffixes 1-3 the bars before it; mn/mx the alligator min/max.
+_BULLISH_EXPR = ("(c > (h + l) / 2) & (ao < ao1) & (l < l1) & (l < l2) & (l < l3)"
+                 " & (o < c) & ((h < mn) | (l > mx))")
+_BEARISH_EXPR = ("(c < (h + l) / 2) & (ao > ao1) & (h > h1) & (h > h2) & (h > h3)"
+                 " & (o > c) & ((h < mn) | (l > mx))")
+
+
+@_memoize
+def _divergent_signal_numexpr(open_, high, low, close, jaw, teeth, lips, ao):
+    """Signal from two fused numexpr passes (used when numba is unavailable)."""
+    open_, high, low, close, jaw, teeth, lips, ao = (
+        np.asarray(a, dtype=float) for a in (open_, high, low, close, jaw, teeth, lips, ao)
+    )
+    n = len(close)
+    out = np.zeros(n, dtype=np.int8)
+    if n <= 3:
+        return out
+    mn, mx = _alligator_bounds(jaw[3:], teeth[3:], lips[3:])
+    local_dict = {
+        'o': open_[3:], 'c': close[3:], 'mn': mn, 'mx': mx,
+        'h': high[3:], 'h1': high[2:-1], 'h2': high[1:-2], 'h3': high[:-3],
+        'l': low[3:], 'l1': low[2:-1], 'l2': low[1:-2], 'l3': low[:-3],
+        'ao': ao[3:], 'ao1': ao[2:-1],
+    }
+    bullish = numexpr.evaluate(_BULLISH_EXPR, local_dict=local_dict)
+    bearish = numexpr.evaluate(_BEARISH_EXPR, local_dict=local_dict)
+    out[3:] = bullish.view(np.int8) - bearish.view(np.int8)
+    return out
+
+
+@_memoize
+def _divergent_signal_numpy(open_, high, low, close, jaw, teeth, lips, ao):
+    """Signal evaluated only at candidate bars (a new 3-bar low or high); the
+    remaining predicates read just those bars. Used without numba or numexpr."""
+    open_, high, low, close, jaw, teeth, lips, ao = (
+        np.asarray(a, dtype=float) for a in (open_, high, low, close, jaw, teeth, lips, ao)
+    )
+    out = np.zeros(len(close), dtype=np.int8)
+    if len(close) <= 3:
+        return out
+    local_min = low[3:] < _prior_extreme(low, np.fmin)
+    local_max = high[3:] > _prior_extreme(high, np.fmax)
+    cand = np.flatnonzero(local_min | local_max)
+    local_min, local_max = local_min[cand], local_max[cand]
+    i = cand + 3
+    o, h, l, c = open_[i], high[i], low[i], close[i]
+    min_alligator, max_alligator = _alligator_bounds(jaw[i], teeth[i], lips[i])
+    mid = (h + l) / 2
+    no_cross = (h < min_alligator) | (l > max_alligator)
+    ao_now, ao_prev = ao[i], ao[i - 1]
+    bullish = local_min & (c > mid) & (ao_now < ao_prev) & (o < c) & no_cross
+    bearish = local_max & (c < mid) & (ao_now > ao_prev) & (o > c) & no_cross
+    out[i] = bullish.view(np.int8) - bearish.view(np.int8)
+    return out
+
+
+def divergent_signal(open_, high, low, close):
+    """
+    DivergentBar's signal (1 bullish, -1 bearish, 0) for raw OHLC arrays,
+    computed outside a Backtest (e.g. for parameter sweeps).
+    """
+    ao = _awesome_oscillator(high, low)
+    jaw, teeth, lips = _alligator_lines(close)
+    return DivergentBar.divergent_bar_indicator(open_, high, low, close, jaw, teeth, lips, ao)
+
 
 class DivergentBar(TrailingStrategy):
+    # next() relies on exclusive orders: a new entry closes the open position
+    # and cancels stale pending orders. Backtest(..., exclusive_orders=True)
+    # does this in buy()/sell(); otherwise place_divergent_order does it.
+
+    # Also build the per-condition matrix (self._cond_matrix) for LLM diagnostics.
+    store_conditions = False
+    # Ratchet the SL to the profit-zone structural level while in a position;
+    # set False (e.g. bt.run(use_trailing=False)) for the no-trail variant.
+    use_trailing = True
+    # Bars in the structural (profit-zone) trailing window
+    trail_bars = 3
+    # ATR multiple for TrailingStrategy's trailing SL (its default is 6)
+    n_atr = 6.
+
     def init(self):
         super().init()
+        self.set_trailing_sl(self.n_atr)
+        # Plain float64 copies of the OHLC columns, converted once and shared by
+        # the indicator functions and the per-bar lookups in next()
+        open_, high, low, close = (np.asarray(self.data[col], dtype=np.float64)
+                                   for col in ('Open', 'High', 'Low', 'Close'))
         # Precompute AO indicator as bars
         self.ao = self.I(
-            self.ao_indicator, self.data.High, self.data.Low
+            self.ao_indicator, high, low, name='AO'
         )
         # Precompute Alligator indicator (returns 3 lines: jaw, teeth, lips) with colors
         self.jaw, self.teeth, self.lips = self.I(
-            self.alligator_indicator, self.data.Close,
+            self.alligator_indicator, close,
             name=['Jaw', 'Teeth', 'Lips'],
             color=['blue', 'red', 'green']
         )
         # Precompute Divergent Bar indicator
         self.divergent = self.I(
             self.divergent_bar_indicator,
-            self.data.Open, self.data.High, self.data.Low, self.data.Close,
+            open_, high, low, close,
             self.jaw, self.teeth, self.lips, self.ao,
             name='DivergentBar', color='purple'
         )
+        if self.store_conditions:
+            # Store condition matrix for analysis (used by LLM context builder)
+            result, conditions = _divergent_conditions(
+                open_, high, low, close, self.jaw, self.teeth, self.lips, self.ao
+            )
+            try:
+                self._cond_matrix = pd.DataFrame({
+                    **{name: cond.astype(np.int8) for name, cond in conditions.items()},
+                    'signal': result
+                })
+            except Exception:
+                pass
+        # Plain (unsliced) per-bar arrays, indexed by bar in next():
+        # the signal plus the entry stop / SL / cancel levels it implies
+        self._signal = np.asarray(self.divergent)
+        self._high = high
+        self._low = low
+        self._long_sl = low - (high - low)
+        self._short_sl = high + (high - low)
         self.cancel_price = None
 
-    def ao_indicator(self, high, low):
+    @staticmethod
+    def ao_indicator(high, low):
         """
         Calculate the Awesome Oscillator (AO) indicator manually.
         AO = SMA(Median Price, 5) - SMA(Median Price, 34)
         Median Price = (High + Low) / 2
         """
-        median_price = (high + low) / 2
-        sma_5 = pd.Series(median_price).rolling(window=5).mean()
-        sma_34 = pd.Series(median_price).rolling(window=34).mean()
-        return sma_5 - sma_34
+        return _awesome_oscillator(high, low)
 
-    def alligator_indicator(self, close):
+    @staticmethod
+    def alligator_indicator(close):
         """
         Calculate the Alligator indicator (Jaw, Teeth, Lips).
         Jaw: 13-period SMA shifted 8 bars
         Teeth: 8-period SMA shifted 5 bars
         Lips: 5-period SMA shifted 3 bars
-        Returns three pandas Series for overlaying on the plot.
+        Returns three numpy arrays for overlaying on the plot.
         """
-        jaw = pd.Series(close).rolling(window=13).mean().shift(8)
-        teeth = pd.Series(close).rolling(window=8).mean().shift(5)
-        lips = pd.Series(close).rolling(window=5).mean().shift(3)
-        return jaw, teeth, lips
-    
-    def divergent_bar_indicator(self, open_, high, low, close, jaw, teeth, lips, ao):
+        return _alligator_lines(close)
+
+    @staticmethod
+    def divergent_bar_indicator(open_, high, low, close, jaw, teeth, lips, ao):
         """
         Vectorized indicator for divergent bars.
         Returns 1 for bullish divergent bar, -1 for bearish, 0 otherwise.
@@ -64,129 +389,111 @@ class DivergentBar(TrailingStrategy):
             - high > max(jaw, teeth, lips)
             - ao > ao.shift(1)
             - high > max(high.shift(1), high.shift(2), high.shift(3))
+        Uses the compiled kernel (AOT build or numba) when available, else
+        numexpr, else numpy.
         """
-        jaw = pd.Series(jaw)
-        teeth = pd.Series(teeth)
-        lips = pd.Series(lips)
-        ao = pd.Series(ao)
-        low = pd.Series(low)
-        high = pd.Series(high)
-        close = pd.Series(close)
-        min_alligator = pd.concat([jaw, teeth, lips], axis=1).min(axis=1)
-        max_alligator = pd.concat([jaw, teeth, lips], axis=1).max(axis=1)
-        upper_half = close > (high + low) / 2
-        lower_half = close < (high + low) / 2
-        local_min = low < pd.concat([low.shift(1), low.shift(2), low.shift(3)], axis=1).min(axis=1)
-        local_max = high > pd.concat([high.shift(1), high.shift(2), high.shift(3)], axis=1).max(axis=1)
-        # Bar does not cross any alligator line
-        no_cross = (
-            (high < min_alligator) | (low > max_alligator)
-        )
-        ao_down = ao < ao.shift(1)
-        ao_up = ao > ao.shift(1)
-        bullish = upper_half & ao_down & local_min & (open_ < close) & no_cross
-        bearish = lower_half & ao_up & local_max & (open_ > close) & no_cross
-        result = pd.Series(0, index=close.index)
-        result[bullish] = 1
-        result[bearish] = -1
-        # Store condition matrix for analysis (used by LLM context builder)
-        try:
-            self._cond_matrix = pd.DataFrame({
-                'upper_half': upper_half.astype(int),
-                'lower_half': lower_half.astype(int),
-                'local_min': local_min.astype(int),
-                'local_max': local_max.astype(int),
-                'ao_down': ao_down.astype(int),
-                'ao_up': ao_up.astype(int),
-                'no_cross': no_cross.astype(int),
-                'signal': result
-            })
-        except Exception:
-            pass
-        return result.values
-
-    def place_divergent_order(self, direction):
+        if _native_divergent_loop is not None or NUMBA_AVAILABLE:
+            return _divergent_signal(open_, high, low, close, jaw, teeth, lips, ao)
+        if numexpr is not None:
+            return _divergent_signal_numexpr(open_, high, low, close, jaw, teeth, lips, ao)
+        return _divergent_signal_numpy(open_, high, low, close, jaw, teeth, lips, ao)
+
+    def place_divergent_order(self, direction, i=None):
         """Place new divergent order (limit + SL) for current bar.
-        direction: 1 (bullish) or -1 (bearish)."""
-        high = self.data.High[-1]
-        low = self.data.Low[-1]
+        direction: 1 (bullish) or -1 (bearish); i: current bar index if known."""
+        if i is None:
+            i = len(self.data) - 1
+        # Broker._exclusive_orders is private (backtesting 0.6.x); if absent,
+        # the cancel/close below is applied unconditionally
+        if not getattr(self._broker, '_exclusive_orders', False):
+            # What the broker does for exclusive_orders=True before a new entry
+            for order in self.orders:
+                if not order.is_contingent:
+                    order.cancel()
+            for trade in self.trades:
+                trade.close()
+        high, low = self._high[i], self._low[i]
         if direction > 0:
-            stop = high
-            sl = low - (high - low)
-            self.buy(stop=stop, sl=sl)
+            self.buy(stop=high, sl=self._long_sl[i])
             self.cancel_price = low
         elif direction < 0:
-            stop = low
-            sl = high + (high - low)
-            self.sell(stop=stop, sl=sl)
+            self.sell(stop=low, sl=self._short_sl[i])
             self.cancel_price = high
 
-    def update_profit_trailing_sl(self, n: int = 5, buffer: float = 0.0):
+    def update_profit_trailing_sl(self, n: int = 5, buffer: float = 0.0, i: int = None):
         """
         Move stop-loss only when the structural level is already in PROFIT zone.
         Long:
-            structural = max(low over last n bars) - buffer
+            structural = min(low over last n bars) - buffer
             Apply only if structural > entry_price (locks profit)
         Short:
-            structural = min(high over last n bars) + buffer
+            structural = max(high over last n bars) + buffer
             Apply only if structural < entry_price
         Stops only tighten (never loosen).
+        i: current bar index if the caller already has it.
         """
-        if self.position.size == 0:
+        trades = self.trades
+        if not trades:
             return
-        window = min(len(self.data.Close), n)
-        lows = self.data.Low[-window:]
-        highs = self.data.High[-window:]
-        struct_long_sl = lows.max() - buffer
-        struct_short_sl = highs.min() + buffer
+        if i is None:
+            i = len(self.data) - 1
+        window = min(i + 1, n)
+        lows = self._low[i - window + 1:i + 1]
+        highs = self._high[i - window + 1:i + 1]
+        # Swing extremes of the window: lowest low / highest high
+        struct_long_sl = lows.min() - buffer
+        struct_short_sl = highs.max() + buffer
 
-        for trade in self.trades:
+        for trade in trades:
+            entry_price, sl = trade.entry_price, trade.sl
             if trade.is_long:
                 # Require structural level in profit (above entry)
-                if struct_long_sl > trade.entry_price:
-                    if trade.sl is None or struct_long_sl > trade.sl:
+                if struct_long_sl > entry_price:
+                    if sl is None or struct_long_sl > sl:
                         trade.sl = struct_long_sl
             elif trade.is_short:
                 # Require structural level in profit (below entry)
-                if struct_short_sl < trade.entry_price:
-                    if trade.sl is None or struct_short_sl < trade.sl:
+                if struct_short_sl < entry_price:
+                    if sl is None or struct_short_sl < sl:
                         trade.sl = struct_short_sl
 
 
     def next(self):
         # --- Main per-bar logic ---
+        i = len(self.data) - 1
+        signal = int(self._signal[i])
+        # Fast path for most bars: flat, nothing pending and no signal leaves
+        # nothing to trail, cancel or place (TrailingStrategy.next is a no-op)
+        if signal == 0 and not self.orders and not self.trades:
+            return
         super().next()
-        signal = self.divergent[-1]
 
         # Manage existing position (reversal or trail)
-        if self.position.size != 0:
-            opposite = (signal > 0 and self.position.is_short) or (signal < 0 and self.position.is_long)
-            if signal != 0 and opposite:
-                # Reverse immediately
-                self.position.close()
-                self.place_divergent_order(signal)
+        position = self.position
+        size = position.size
+        if size != 0:
+            if signal * size < 0:  # signal opposes the open position
+                # Reverse immediately (the exclusive entry closes the open trades)
+                self.place_divergent_order(signal, i)
             else:
                 # Trail only if profitable
-                if self.position.pl > 0:
-                    self.update_profit_trailing_sl(n=3)
+                if self.use_trailing and position.pl > 0:
+                    self.update_profit_trailing_sl(n=self.trail_bars, i=i)
             return
 
-        # Cancel pending orders if current bar invalidates prior setup relative to cancel_price
-        # (restored logic from previous version)
-        if self.cancel_price is not None and self.orders:
-            for order in list(self.orders):
-                if order.is_long and self.cancel_price >= self.data.Low[-1]:
-                    order.cancel()
-                elif order.is_short and self.cancel_price <= self.data.High[-1]:
-                    order.cancel()
-
-
-        # Flat: handle new signal
-        if signal == 0:
+        # Flat: a new signal replaces any pending order (the exclusive entry
+        # cancels it), so the cancel check only matters on no-signal bars
+        if signal != 0:
+            self.place_divergent_order(signal, i)
             return
-        # Cancel any stale pending orders before placing fresh one
-        if self.orders:
-            for o in list(self.orders):
-                o.cancel()
 
-        self.place_divergent_order(signal)
\ No newline at end of file
+        # Cancel pending orders if current bar invalidates prior setup relative to cancel_price
+        # (restored logic from previous version)
+        cancel_price, orders = self.cancel_price, self.orders
+        if cancel_price is not None and orders:
+            cancel_long = cancel_price >= self._low[i]
+            cancel_short = cancel_price <= self._high[i]
+            if cancel_long or cancel_short:
+                for order in list(orders):
+                    if cancel_long if order.is_long else cancel_short:
+                        order.cancel()
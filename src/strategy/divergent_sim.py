@@ -0,0 +1,240 @@
+"""Compiled DivergentBar simulator for parameter sweeps.
+
+`simulate` replays DivergentBar's order logic on raw arrays in a single loop:
+stop entries at the signal bar's high/low with a bar-range SL, reversal on an
+opposite signal, the cancel level while flat, TrailingStrategy's ATR trailing
+and the profit-zone structural trailing. Fills follow backtesting.py's broker
+with `exclusive_orders=True, finalize_trades=True` (market closes at the open
+first, then SL orders, then stop entries; whole-unit full-equity sizing;
+relative commission on entry and exit).
+
+Use it to rank parameter sets quickly, then validate the chosen set with
+`Backtest.run()` (see sweep.py). `run_sweep` runs full Backtests over a
+parameter grid in a process pool when the real engine is needed.
+"""
+from __future__ import annotations
+import multiprocessing
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from backtesting import Backtest
+from src.strategy import divergent_bar
+from src.strategy.divergent_bar import DivergentBar, divergent_signal, _awesome_oscillator, _alligator_lines
+from src.utils._njit import njit, prange
+
+
+# backtesting.py's default order size (Strategy.buy/sell size=_FULL_EQUITY)
+_FULL_EQUITY = 1 - sys.float_info.epsilon
+
+
+def trailing_atr(high, low, close, periods: int = 100) -> np.ndarray:
+    """ATR exactly as TrailingStrategy.set_atr_periods computes it."""
+    hi, lo = np.asarray(high, dtype=float), np.asarray(low, dtype=float)
+    c_prev = pd.Series(np.asarray(close, dtype=float)).shift(1)
+    tr = np.max([hi - lo, (c_prev - hi).abs(), (c_prev - lo).abs()], axis=0)
+    return pd.Series(tr).rolling(periods).mean().bfill().values
+
+
+def simulation_inputs(df: pd.DataFrame):
+    """
+    Arrays for `simulate` from an OHLC frame:
+    (signal, open, high, low, close, atr, start). `start` is the first bar
+    Backtest hands to Strategy.next (one past the indicator warm-up).
+    """
+    open_, high, low, close = (np.asarray(df[col], dtype=float)
+                               for col in ('Open', 'High', 'Low', 'Close'))
+    signal = divergent_signal(open_, high, low, close)
+    indicators = [_awesome_oscillator(high, low), *_alligator_lines(close)]
+    start = 1 + max(int(np.argmax(~np.isnan(ind))) if not np.isnan(ind).all() else len(close)
+                    for ind in indicators)
+    return signal, open_, high, low, close, trailing_atr(high, low, close), start
+
+
+@njit(cache=True)
+def simulate(signal, open_, high, low, close, atr, start,
+             n_atr=6., trail_bars=3, use_trailing=True, cash=10_000., commission=.002):
+    """
+    Run DivergentBar over bars start..N-1.
+    Returns (entry_bar, exit_bar, size, entry_price, exit_price, pnl, final_equity);
+    pnl is net of entry and exit commission, as in stats['_trades']['PnL'].
+    final_equity is stats['Equity Final [$]']: Backtest's finalize pass re-runs
+    the broker on the last bar, so an entry placed there can still fill and is
+    marked to the last close (it is not a closed trade and not returned).
+    """
+    n = len(close)
+    entry_bars = np.empty(n + 1, dtype=np.int64)
+    exit_bars = np.empty(n + 1, dtype=np.int64)
+    sizes = np.empty(n + 1, dtype=np.int64)
+    entry_prices = np.empty(n + 1)
+    exit_prices = np.empty(n + 1)
+    pnls = np.empty(n + 1)
+    count = 0
+
+    pos = 0            # signed units of the open trade
+    entry_price = 0.
+    entry_bar = 0
+    sl = 0.
+    close_pending = False  # market close queued by a reversal / finalize
+    pend_dir = 0       # pending stop entry: 1 long, -1 short, 0 none
+    pend_stop = 0.
+    pend_sl = 0.
+    cancel_price = np.nan
+
+    for k in range(start, n + 1):
+        final = k == n
+        if final:
+            if start >= n:
+                break
+            # finalize_trades: close at the last bar's open, then the broker
+            # pass repeats on the last bar (a pending entry may still fill)
+            close_pending = pos != 0
+        i = min(k, n - 1)
+        o = open_[i]
+
+        # --- Broker: market close (queued ahead of the SL), SL, stop entry ---
+        exit_price = np.nan
+        if pos != 0 and close_pending:
+            exit_price = o
+        elif pos > 0 and low[i] <= sl:
+            exit_price = min(o, sl)
+        elif pos < 0 and high[i] >= sl:
+            exit_price = max(o, sl)
+        close_pending = False
+        if pos != 0 and not np.isnan(exit_price):
+            exit_commission = abs(pos) * exit_price * commission
+            cash += pos * (exit_price - entry_price) - exit_commission
+            entry_bars[count] = entry_bar
+            exit_bars[count] = i
+            sizes[count] = pos
+            entry_prices[count] = entry_price
+            exit_prices[count] = exit_price
+            pnls[count] = (pos * (exit_price - entry_price)
+                           - (exit_commission + abs(pos) * entry_price * commission))
+            count += 1
+            pos = 0
+
+        if pend_dir != 0 and pos == 0:
+            hit = high[i] >= pend_stop if pend_dir > 0 else low[i] <= pend_stop
+            if hit:
+                price = max(o, pend_stop) if pend_dir > 0 else min(o, pend_stop)
+                price_plus_commission = price + (_FULL_EQUITY * price * commission) / _FULL_EQUITY
+                units = int((max(0., cash) * _FULL_EQUITY) // price_plus_commission)
+                if units:
+                    pos = pend_dir * units
+                    entry_price = price
+                    entry_bar = i
+                    sl = pend_sl
+                    cash -= units * price * commission
+                pend_dir = 0
+        if final:
+            break
+
+        # --- Strategy.next at the bar close ---
+        c = close[i]
+        if pos > 0:
+            sl = max(sl, c - atr[i] * n_atr)
+        elif pos < 0:
+            sl = min(sl, c + atr[i] * n_atr)
+
+        sig = signal[i]
+        if pos != 0:
+            if (sig > 0 and pos < 0) or (sig < 0 and pos > 0):
+                close_pending = True
+                pend_dir = 0
+            else:
+                if use_trailing and c * pos - pos * entry_price > 0:
+                    w = min(i + 1, trail_bars)
+                    if pos > 0:
+                        struct_sl = low[i - w + 1:i + 1].min()
+                        if struct_sl > entry_price and struct_sl > sl:
+                            sl = struct_sl
+                    else:
+                        struct_sl = high[i - w + 1:i + 1].max()
+                        if struct_sl < entry_price and struct_sl < sl:
+                            sl = struct_sl
+                continue
+        elif pend_dir != 0 and not np.isnan(cancel_price):
+            if pend_dir > 0 and cancel_price >= low[i]:
+                pend_dir = 0
+            elif pend_dir < 0 and cancel_price <= high[i]:
+                pend_dir = 0
+
+        if sig > 0:
+            pend_dir, pend_stop = 1, high[i]
+            pend_sl = low[i] - (high[i] - low[i])
+            cancel_price = low[i]
+        elif sig < 0:
+            pend_dir, pend_stop = -1, low[i]
+            pend_sl = high[i] + (high[i] - low[i])
+            cancel_price = high[i]
+
+    equity = cash
+    if pos != 0:
+        equity += close[n - 1] * pos - pos * entry_price
+    return (entry_bars[:count], exit_bars[:count], sizes[:count],
+            entry_prices[:count], exit_prices[:count], pnls[:count], equity)
+
+
+@njit(cache=True, parallel=True)
+def sweep_grid(signal, open_, high, low, close, atr, start, n_atrs, trail_bars,
+               use_trailing=True, cash=10_000., commission=.002):
+    """
+    Simulate every (n_atrs[k], trail_bars[k]) pair in parallel.
+    Returns (final equity, number of trades) per pair.
+    """
+    m = len(n_atrs)
+    equity = np.empty(m)
+    n_trades = np.empty(m, dtype=np.int64)
+    for k in prange(m):
+        result = simulate(signal, open_, high, low, close, atr, start,
+                          n_atrs[k], trail_bars[k], use_trailing, cash, commission)
+        equity[k] = result[6]
+        n_trades[k] = len(result[0])
+    return equity, n_trades
+
+
+# ------------------------- Backtest process pool ------------------------- #
+# Set once per worker by _init_worker so tasks only pickle their params.
+_shared_data: Optional[pd.DataFrame] = None
+_shared_backtest_kwargs: Dict[str, Any] = {}
+
+
+def _init_worker(data: pd.DataFrame, backtest_kwargs: Dict[str, Any], use_talib: bool):
+    global _shared_data, _shared_backtest_kwargs
+    _shared_data = data
+    _shared_backtest_kwargs = backtest_kwargs
+    # Fresh interpreter: carry over the parent's SMA backend choice
+    divergent_bar.USE_TALIB = use_talib
+
+
+def _run_params(params: Dict[str, Any]) -> pd.Series:
+    return Backtest(_shared_data, DivergentBar, **_shared_backtest_kwargs).run(**params)
+
+
+def run_sweep(data: pd.DataFrame, params_grid: Sequence[Dict[str, Any]], n_workers: Optional[int] = None,
+              **backtest_kwargs) -> List[pd.Series]:
+    """
+    Run Backtest(data, DivergentBar, **backtest_kwargs).run(**params) for every
+    params dict in a multiprocessing pool; returns the stats in grid order.
+    Workers receive `data` once through the pool initializer and each task
+    pickles only its params. backtest_kwargs default to cash=10_000,
+    commission=.002, exclusive_orders=True, finalize_trades=True.
+    Workers start via 'forkserver' ('spawn' where unavailable), never a plain
+    fork: forking after a numba parallel call (e.g. `sweep_grid`) copies the
+    TBB thread pool state and can hang the parent at exit.
+    """
+    backtest_kwargs = {'cash': 10_000, 'commission': .002, 'exclusive_orders': True,
+                       'finalize_trades': True, **backtest_kwargs}
+    params_grid = list(params_grid)
+    if not params_grid:
+        return []
+    try:
+        ctx = multiprocessing.get_context('forkserver')
+    except ValueError:  # pragma: no cover - platforms without forkserver (Windows)
+        ctx = multiprocessing.get_context('spawn')
+    n_workers = min(n_workers or ctx.cpu_count(), len(params_grid))
+    chunksize = max(1, len(params_grid) // (n_workers * 4))
+    with ctx.Pool(n_workers, initializer=_init_worker,
+                  initargs=(data, backtest_kwargs, divergent_bar.USE_TALIB)) as pool:
+        return pool.map(_run_params, params_grid, chunksize=chunksize)
@@ -11,7 +11,7 @@ Usage outline:
     from .divergent_bar import DivergentBar
     from .strategy_ai import build_llm_prompt, extract_context
 
-    bt = Backtest(data, DivergentBar, cash=10_000, commission=.002)
+    bt = Backtest(data, DivergentBar, cash=10_000, commission=.002, exclusive_orders=True)
     stats = bt.run()
     ctx = extract_context(stats, max_trades=30)
     prompt = build_llm_prompt(ctx)
@@ -33,6 +33,12 @@ try:
     from openai import OpenAI  # type: ignore
 except Exception:  # pragma: no cover - absence handled gracefully
     OpenAI = None  # sentinel
+try:
+    # Optional import; faster JSON encode/decode, falls back to the stdlib
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - absence handled gracefully
+    orjson = None  # sentinel
+import numpy as np
 import pandas as pd
 
 SUGGESTION_SCHEMA_EXAMPLE = [
@@ -43,6 +49,18 @@ SUGGESTION_SCHEMA_EXAMPLE = [
     }
 ]
 
+# JSON helpers shared with the CLI tools: orjson when installed, else json
+if orjson is not None:
+    def dumps(obj: Any) -> str:
+        """Serialize to 2-space indented JSON text (NaN becomes null)."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    loads = orjson.loads
+else:
+    def dumps(obj: Any) -> str:
+        """Serialize to 2-space indented JSON text (NaN stays NaN)."""
+        return json.dumps(obj, indent=2)
+    loads = json.loads
+
 @dataclass
 class TradeContext:
     direction: str
@@ -79,6 +97,12 @@ Schema example for your response:
 {schema_example}
 """.strip()
 
+# The schema example is constant, so it is serialized and spliced into the
+# template once; build_llm_prompt only inserts the per-run context JSON.
+_SCHEMA_EXAMPLE_JSON = dumps(SUGGESTION_SCHEMA_EXAMPLE)
+_PROMPT_HEAD, _PROMPT_TAIL = PROMPT_TEMPLATE.split("{context_json}")
+_PROMPT_TAIL = _PROMPT_TAIL.format(schema_example=_SCHEMA_EXAMPLE_JSON)
+
 
 def extract_context(stats: Dict[str, Any], max_trades: int = 30) -> StrategyContext:
     trades: pd.DataFrame = stats['_trades']
@@ -89,53 +113,66 @@ def extract_context(stats: Dict[str, Any], max_trades: int = 30) -> StrategyCont
         max_dd_pct=float(stats['Max. Drawdown [%]']),
         sharpe=float(stats['Sharpe Ratio'])
     )
-    # Sort by return pct
-    sorted_trades = trades.assign(ReturnPct=trades['ReturnPct']).sort_values('ReturnPct')
-    losers_df = sorted_trades.head(min(5, len(sorted_trades)))
-    winners_df = sorted_trades.tail(min(5, len(sorted_trades)))
-
-    def row_to_ctx(row: pd.Series) -> TradeContext:
-        size = row['Size']
-        direction = 'long' if size > 0 else 'short'
-        return TradeContext(
-            direction=direction,
-            entry_bar=int(row['EntryBar']),
-            exit_bar=int(row['ExitBar']) if not pd.isna(row['ExitBar']) else None,
-            pnl=float(row['PnL']),
-            return_pct=float(row['ReturnPct']),
-            duration=int(row['ExitBar'] - row['EntryBar']) if not pd.isna(row['ExitBar']) else 0,
-            entry_signal_val=float(row.get('Entry_DivergentBar', 0)),
-            exit_signal_val=float(row.get('Exit_DivergentBar', 0)),
-        )
-
-    losers = [row_to_ctx(r) for _, r in losers_df.iterrows()]
-    winners = [row_to_ctx(r) for _, r in winners_df.iterrows()]
+    # Bottom / top 5 by return pct (ascending, as a full sort would list them);
+    # argpartition selects them in O(N) instead of sorting every trade
+    rp = trades['ReturnPct'].to_numpy()
+    k = min(5, len(rp))
+    lo = np.argpartition(rp, k - 1)[:k] if k else np.arange(0)
+    hi = np.argpartition(rp, len(rp) - k)[len(rp) - k:] if k else np.arange(0)
+    lo = lo[np.argsort(rp[lo], kind='stable')]
+    hi = hi[np.argsort(rp[hi], kind='stable')]
+
+    def to_ctx(idx: np.ndarray) -> List[TradeContext]:
+        # Gather just the selected rows of each column (signal columns may be absent)
+        columns = [
+            trades[c].to_numpy()[idx].astype(float) if c in trades.columns else np.zeros(len(idx))
+            for c in ('Size', 'EntryBar', 'ExitBar', 'PnL', 'ReturnPct',
+                      'Entry_DivergentBar', 'Exit_DivergentBar')
+        ]
+        out = []
+        for size, entry_bar, exit_bar, pnl, return_pct, entry_sig, exit_sig in zip(*columns):
+            closed = not np.isnan(exit_bar)
+            out.append(TradeContext(
+                direction='long' if size > 0 else 'short',
+                entry_bar=int(entry_bar),
+                exit_bar=int(exit_bar) if closed else None,
+                pnl=float(pnl),
+                return_pct=float(return_pct),
+                duration=int(exit_bar - entry_bar) if closed else 0,
+                entry_signal_val=float(entry_sig),
+                exit_signal_val=float(exit_sig),
+            ))
+        return out
+
+    losers = to_ctx(lo)
+    winners = to_ctx(hi)
 
     return StrategyContext(performance=perf, top_winners=winners, top_losers=losers)
 
 
-def build_condition_diagnostics(strat: Any) -> List[Dict[str, Any]]:
-    """Summarize per-condition pass rates & win rates if condition matrix exists.
+def build_condition_diagnostics(stats: Any) -> List[Dict[str, Any]]:
+    """Summarize per-condition pass rates & signal rates if condition matrix exists.
 
-    Expects strat._cond_matrix (DataFrame) & strat._broker (Backtesting internal) to inspect trades.
+    `stats` is the result of Backtest.run(); reads stats._strategy._cond_matrix,
+    which DivergentBar only builds when run with store_conditions=True.
     This function is resilient: returns [] if data unavailable.
     """
-    import pandas as pd
     try:
-        cm: pd.DataFrame = strat._strategy._cond_matrix  # type: ignore
+        cm: pd.DataFrame = stats._strategy._cond_matrix  # type: ignore
     except Exception:
         return []
     if 'signal' not in cm.columns:
         return []
+    signal = cm['signal'].to_numpy()
     diag = []
     for col in cm.columns:
         if col == 'signal':
             continue
-        series = cm[col]
-        pass_rate = float(series.mean())
+        passed = cm[col].to_numpy() == 1
+        pass_rate = float(np.count_nonzero(passed)) / passed.size if passed.size else float('nan')
         # Correlate with eventual signal occurrence
-        sig_when_pass = cm.loc[series == 1, 'signal']
-        signal_rate = float((sig_when_pass != 0).mean()) if len(sig_when_pass) else 0.0
+        sig_when_pass = signal[passed]
+        signal_rate = float(np.count_nonzero(sig_when_pass)) / sig_when_pass.size if sig_when_pass.size else 0.0
         diag.append({
             'condition': col,
             'pass_rate': pass_rate,
@@ -145,18 +182,15 @@ def build_condition_diagnostics(strat: Any) -> List[Dict[str, Any]]:
 
 
 def build_llm_prompt(ctx: StrategyContext) -> str:
-    context_json = json.dumps({
-        'performance': asdict(ctx.performance),
-        'top_winners': [asdict(t) for t in ctx.top_winners],
-        'top_losers': [asdict(t) for t in ctx.top_losers],
-    }, indent=2)
-    return PROMPT_TEMPLATE.format(context_json=context_json, schema_example=json.dumps(SUGGESTION_SCHEMA_EXAMPLE, indent=2))
+    # asdict recurses into the nested dataclasses (field order is preserved)
+    context_json = dumps(asdict(ctx))
+    return _PROMPT_HEAD + context_json + _PROMPT_TAIL
 
 
 def parse_suggestions(raw_text: str) -> List[Dict[str, str]]:
     """Attempt to parse LLM JSON suggestions; returns empty list on failure."""
     try:
-        data = json.loads(raw_text)
+        data = loads(raw_text)
         if isinstance(data, list):
             cleaned = []
             for item in data:
@@ -0,0 +1,20 @@
+"""numba's njit/prange, or no-op stand-ins when numba is not installed.
+
+Decorated kernels then run as plain Python; callers that have a faster
+vectorized alternative can branch on NUMBA_AVAILABLE instead.
+"""
+from __future__ import annotations
+
+try:
+    # Optional import; kernels run uncompiled without it
+    from numba import njit, prange  # type: ignore
+    NUMBA_AVAILABLE = True
+except Exception:  # pragma: no cover - absence handled gracefully
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit (bare or with options)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
@@ -0,0 +1,45 @@
+"""CSV loading shared by the CLI scripts.
+
+Uses pyarrow's multithreaded CSV reader when installed and falls back to the
+default pandas parser otherwise (or when pyarrow cannot infer a file's types).
+"""
+from __future__ import annotations
+from typing import Optional
+import pandas as pd
+
+try:
+    # Optional import; pandas' C parser is used without it
+    import pyarrow as pa  # type: ignore
+    from pyarrow import csv as pacsv  # type: ignore
+except Exception:  # pragma: no cover - absence handled gracefully
+    pa = None  # sentinel
+    pacsv = None
+
+# One big-block reader config reused for every file (batch runs included)
+_READ_OPTIONS = pacsv.ReadOptions(block_size=16 << 20) if pacsv is not None else None
+
+
+def read_csv(path: str, index_col: Optional[str] = None) -> pd.DataFrame:
+    """Load a CSV into a DataFrame.
+
+    With `index_col`, that column is parsed to datetimes and used as the index,
+    like `pd.read_csv(path, parse_dates=True, index_col=index_col)`.
+    """
+    if pacsv is not None:
+        # Read the index column as text so pd.to_datetime parses it exactly as
+        # pd.read_csv(parse_dates=True) would (pyarrow's own timestamp
+        # inference picks a different resolution, e.g. datetime64[s])
+        convert_options = (pacsv.ConvertOptions(column_types={index_col: pa.string()})
+                           if index_col is not None else None)
+        try:
+            df = pacsv.read_csv(path, read_options=_READ_OPTIONS, convert_options=convert_options).to_pandas()
+        except pa.ArrowInvalid:
+            df = None
+        if df is not None:
+            if index_col is not None:
+                df[index_col] = pd.to_datetime(df[index_col])
+                df = df.set_index(index_col)
+            return df
+    if index_col is not None:
+        return pd.read_csv(path, parse_dates=True, index_col=index_col)
+    return pd.read_csv(path)
@@ -0,0 +1,80 @@
+"""CLI tool: sweep DivergentBar trailing parameters with the compiled simulator.
+
+Every (n_atr, trail_bars) pair is simulated in one parallel pass without
+backtesting.py; the best pair is then re-run through Backtest for validation.
+With --backtest, every pair runs through Backtest in a process pool instead.
+
+Usage:
+  python sweep.py data.csv --n-atr 2 3 4 6 --trail-bars 2 3 5 [--backtest --workers 8]
+"""
+from __future__ import annotations
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from backtesting import Backtest
+from src.strategy.divergent_bar import DivergentBar
+from src.strategy.divergent_sim import run_sweep, simulation_inputs, sweep_grid
+from src.utils.csv_loader import read_csv
+
+
+def main():
+    p = argparse.ArgumentParser(description="Sweep DivergentBar trailing-stop parameters.")
+    p.add_argument("data", help="CSV file with Date index & OHLC columns")
+    p.add_argument("--n-atr", type=float, nargs="+", default=[2., 3., 4., 6., 8.],
+                   help="ATR multiples for the trailing stop")
+    p.add_argument("--trail-bars", type=int, nargs="+", default=[2, 3, 5, 8],
+                   help="Look-back bars for the profit-zone structural stop")
+    p.add_argument("--no-trailing", action="store_true", help="Disable the structural trailing stop")
+    p.add_argument("--cash", type=int, default=10_000)
+    p.add_argument("--commission", type=float, default=0.002)
+    p.add_argument("--top", type=int, default=10, help="Number of ranked rows to print")
+    p.add_argument("--backtest", action="store_true",
+                   help="Run every pair through Backtest (process pool) instead of the simulator")
+    p.add_argument("--workers", type=int, default=None, help="Pool size for --backtest (default: CPU count)")
+    args = p.parse_args()
+
+    df = read_csv(args.data, index_col='Date')
+    grid = list(itertools.product(args.n_atr, args.trail_bars))
+    n_atrs = np.array([g[0] for g in grid], dtype=float)
+    trail_bars = np.array([g[1] for g in grid], dtype=np.int64)
+    if args.backtest:
+        grid_stats = run_sweep(
+            df, [dict(n_atr=float(a), trail_bars=int(b), use_trailing=not args.no_trailing)
+                 for a, b in grid],
+            args.workers, cash=args.cash, commission=args.commission,
+        )
+        equity = np.array([st['Equity Final [$]'] for st in grid_stats])
+        n_trades = np.array([st['# Trades'] for st in grid_stats])
+    else:
+        equity, n_trades = sweep_grid(*simulation_inputs(df), n_atrs, trail_bars,
+                                      not args.no_trailing, float(args.cash), args.commission)
+
+    ranked = pd.DataFrame({
+        'n_atr': n_atrs,
+        'trail_bars': trail_bars,
+        'equity_final': equity.round(2),
+        'return_pct': ((equity / args.cash - 1) * 100).round(2),
+        'trades': n_trades,
+    }).sort_values('equity_final', ascending=False, kind='stable')
+    print("\n=== Sweep ===")
+    print(ranked.head(args.top).to_string(index=False))
+
+    best = ranked.iloc[0]
+    if args.backtest:
+        print("\n=== Backtest stats (best pair) ===")
+        print(grid_stats[ranked.index[0]])
+        return
+    bt = Backtest(df, DivergentBar, cash=args.cash, commission=args.commission,
+                  exclusive_orders=True, finalize_trades=True)
+    stats = bt.run(n_atr=float(best.n_atr), trail_bars=int(best.trail_bars),
+                   use_trailing=not args.no_trailing)
+    print("\n=== Backtest validation (best pair) ===")
+    print(stats)
+    if not np.isclose(stats['Equity Final [$]'], best.equity_final, atol=.01):
+        print(f"WARNING: simulator equity {best.equity_final} differs from Backtest "
+              f"{stats['Equity Final [$]']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Shared fixtures: synthetic OHLC frames so tests need no data files."""
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# Make `src` importable when pytest is run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _random_ohlc(n=3000, seed=0):
+    """Random-walk daily OHLC rounded to cents, on a business-day index."""
+    rng = np.random.default_rng(seed)
+    close = 500 + np.cumsum(rng.normal(0, 2, n))
+    open_ = close + rng.normal(0, 1, n)
+    high = np.maximum(open_, close) + rng.uniform(0, 3, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 3, n)
+    return pd.DataFrame(
+        {'Open': open_, 'High': high, 'Low': low, 'Close': close},
+        index=pd.bdate_range('2000-01-03', periods=n, name='Date'),
+    ).round(2)
+
+
+@pytest.fixture
+def make_ohlc():
+    """Factory fixture: make_ohlc(n=3000, seed=0) -> OHLC DataFrame."""
+    return _random_ohlc
+
+
+@pytest.fixture(scope='session')
+def ohlc():
+    return _random_ohlc()
@@ -0,0 +1,46 @@
+import glob
+import importlib.util
+import sys
+import types
+import numpy as np
+import pytest
+
+from src.strategy.divergent_bar import (
+    _alligator_lines, _awesome_oscillator, _divergent_loop, _kernel_hash, _load_native,
+)
+
+_NATIVE = 'src.strategy._divergent_native'
+
+
+def _fake_native(**attrs):
+    return types.SimpleNamespace(divergent_loop=object(), **attrs)
+
+
+def test_load_native_checks_kernel_hash(monkeypatch):
+    current = _fake_native(kernel_hash=_kernel_hash)
+    monkeypatch.setitem(sys.modules, _NATIVE, current)
+    assert _load_native() is current.divergent_loop
+    # Built from another _divergent_loop source, or before the hash was exported
+    monkeypatch.setitem(sys.modules, _NATIVE, _fake_native(kernel_hash=lambda: ~_kernel_hash()))
+    assert _load_native() is None
+    monkeypatch.setitem(sys.modules, _NATIVE, _fake_native())
+    assert _load_native() is None
+
+
+def test_aot_build_is_loaded_and_matches_jit(monkeypatch, tmp_path, make_ohlc):
+    pytest.importorskip('numba.pycc')
+    from src.strategy import _compile_indicators
+    monkeypatch.setattr(_compile_indicators.cc, 'output_dir', str(tmp_path))
+    _compile_indicators.cc.compile()
+    path, = glob.glob(str(tmp_path / '_divergent_native*'))
+    spec = importlib.util.spec_from_file_location(_NATIVE, path)
+    native = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(native)
+    monkeypatch.setitem(sys.modules, _NATIVE, native)
+    assert _load_native() is native.divergent_loop
+
+    data = make_ohlc(2000, 8)
+    ohlc = [data[col].to_numpy(dtype=np.float64, copy=True) for col in ('Open', 'High', 'Low', 'Close')]
+    arrays = (*ohlc, *_alligator_lines(ohlc[3]), _awesome_oscillator(ohlc[1], ohlc[2]))
+    np.testing.assert_array_equal(native.divergent_loop(*arrays, np.zeros(2000, dtype=np.int8)),
+                                  _divergent_loop(*arrays, np.zeros(2000, dtype=np.int8)))
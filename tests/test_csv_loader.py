@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from src.utils import csv_loader
+from src.utils.csv_loader import read_csv
+
+_requires_pyarrow = pytest.mark.skipif(csv_loader.pacsv is None, reason='pyarrow not installed')
+
+
+@pytest.fixture
+def ohlc_csv(tmp_path, make_ohlc):
+    path = tmp_path / 'ohlc.csv'
+    make_ohlc(300, 2).to_csv(path)
+    return str(path)
+
+
+@_requires_pyarrow
+def test_pyarrow_path_matches_pandas(ohlc_csv):
+    expected = pd.read_csv(ohlc_csv, parse_dates=True, index_col='Date')
+    df = read_csv(ohlc_csv, index_col='Date')
+    assert df.index.dtype == expected.index.dtype
+    pd.testing.assert_frame_equal(df, expected)
+
+
+@_requires_pyarrow
+def test_falls_back_to_pandas_on_arrow_invalid(tmp_path):
+    # pyarrow rejects a short row; pandas pads it with NaN
+    path = tmp_path / 'short_row.csv'
+    path.write_text('Date,Open,Close\n2001-01-02,1,2\n2001-01-03,3\n2001-01-04,5,6\n')
+    with pytest.raises(csv_loader.pa.ArrowInvalid):
+        csv_loader.pacsv.read_csv(str(path))
+    df = read_csv(str(path), index_col='Date')
+    pd.testing.assert_frame_equal(df, pd.read_csv(path, parse_dates=True, index_col='Date'))
+    assert df['Close'].isna().sum() == 1
+
+
+def test_without_pyarrow(monkeypatch, ohlc_csv):
+    monkeypatch.setattr(csv_loader, 'pacsv', None)
+    pd.testing.assert_frame_equal(read_csv(ohlc_csv, index_col='Date'),
+                                  pd.read_csv(ohlc_csv, parse_dates=True, index_col='Date'))
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+from backtesting import Backtest
+
+from src.strategy.divergent_bar import DivergentBar
+
+# backtesting.py's same-bar SL warning is expected on random data
+pytestmark = pytest.mark.filterwarnings('ignore:.*contingent SL/TP order:UserWarning')
+
+_TRADE_COLUMNS = ['Size', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice']
+
+
+def _backtest(data, strategy=DivergentBar, **kwargs):
+    return Backtest(data, strategy, cash=10_000, commission=.002, finalize_trades=True, **kwargs)
+
+
+class _TrailRecorder(DivergentBar):
+    """Records every SL move made by the profit-zone trailing."""
+
+    def init(self):
+        super().init()
+        self.trail_moves = []
+
+    def update_profit_trailing_sl(self, n: int = 5, buffer: float = 0.0, i: int = None):
+        before = [(trade, trade.sl) for trade in self.trades]
+        super().update_profit_trailing_sl(n, buffer, i)
+        for trade, sl in before:
+            if trade.sl != sl:
+                self.trail_moves.append((i, n, trade.is_long, trade.entry_price, trade.sl))
+
+
+@pytest.mark.parametrize('seed', [5, 9])
+def test_trades_do_not_depend_on_exclusive_orders(make_ohlc, seed):
+    data = make_ohlc(3000, seed)
+    exclusive = _backtest(data, exclusive_orders=True).run()
+    default = _backtest(data).run()
+    assert len(exclusive['_trades']) > 100
+    pd.testing.assert_frame_equal(default['_trades'][_TRADE_COLUMNS],
+                                  exclusive['_trades'][_TRADE_COLUMNS])
+    assert default['Equity Final [$]'] == exclusive['Equity Final [$]']
+
+
+def test_profit_trailing_sl_uses_window_swing_extremes(make_ohlc):
+    # Long stops trail the lowest low of the last trail_bars bars, short stops
+    # the highest high, and only once that level is beyond the entry price.
+    data = make_ohlc(3000, 0)
+    stats = _backtest(data, _TrailRecorder, exclusive_orders=True).run(trail_bars=3)
+    moves = stats._strategy.trail_moves
+    assert {is_long for _, _, is_long, _, _ in moves} == {True, False}
+    low, high = data['Low'].to_numpy(), data['High'].to_numpy()
+    for i, n, is_long, entry_price, sl in moves:
+        if is_long:
+            assert sl == low[i - n + 1:i + 1].min() > entry_price
+        else:
+            assert sl == high[i - n + 1:i + 1].max() < entry_price
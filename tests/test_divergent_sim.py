@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import textwrap
+import numpy as np
+import pytest
+from backtesting import Backtest
+
+from src.strategy.divergent_bar import DivergentBar
+from src.strategy.divergent_sim import run_sweep, simulate, simulation_inputs, sweep_grid
+
+pytestmark = pytest.mark.filterwarnings('ignore:.*contingent SL/TP order:UserWarning')
+
+_CASH, _COMMISSION = 10_000., .002
+
+
+def _backtest(data, **params):
+    return Backtest(data, DivergentBar, cash=_CASH, commission=_COMMISSION,
+                    exclusive_orders=True, finalize_trades=True).run(**params)
+
+
+@pytest.mark.parametrize('n, seed, params', [
+    (3000, 5, {}),
+    (3000, 9, {'n_atr': 1.5, 'trail_bars': 2}),
+    (3000, 11, {'use_trailing': False}),
+    # Signal on the last bar whose entry fills in Backtest's finalize pass
+    (1000, 13, {}),
+])
+def test_simulate_matches_backtest(make_ohlc, n, seed, params):
+    data = make_ohlc(n, seed)
+    stats = _backtest(data, **params)
+    trades = stats['_trades']
+    entry_bar, exit_bar, size, entry_price, exit_price, pnl, equity = simulate(
+        *simulation_inputs(data), params.get('n_atr', 6.), params.get('trail_bars', 3),
+        params.get('use_trailing', True), _CASH, _COMMISSION)
+    np.testing.assert_array_equal(entry_bar, trades['EntryBar'])
+    np.testing.assert_array_equal(exit_bar, trades['ExitBar'])
+    np.testing.assert_array_equal(size, trades['Size'])
+    np.testing.assert_allclose(entry_price, trades['EntryPrice'])
+    np.testing.assert_allclose(exit_price, trades['ExitPrice'])
+    np.testing.assert_allclose(pnl, trades['PnL'])
+    assert equity == pytest.approx(stats['Equity Final [$]'])
+
+
+def test_run_sweep_matches_backtest(make_ohlc):
+    data = make_ohlc(1500, 7)
+    grid = [{'n_atr': 2.}, {'n_atr': 4., 'trail_bars': 5}]
+    for params, stats in zip(grid, run_sweep(data, grid, n_workers=2)):
+        expected = _backtest(data, **params)
+        assert stats['Equity Final [$]'] == expected['Equity Final [$]']
+        assert stats['# Trades'] == expected['# Trades']
+
+
+def test_sweep_grid_matches_simulate(make_ohlc):
+    inputs = simulation_inputs(make_ohlc(2000, 3))
+    n_atrs = np.array([2., 6., 2., 6.])
+    trail_bars = np.array([2, 2, 5, 5], dtype=np.int64)
+    equity, n_trades = sweep_grid(*inputs, n_atrs, trail_bars, True, _CASH, _COMMISSION)
+    for k in range(len(n_atrs)):
+        result = simulate(*inputs, n_atrs[k], trail_bars[k], True, _CASH, _COMMISSION)
+        assert equity[k] == result[6]
+        assert n_trades[k] == len(result[0])
+
+
+def test_run_sweep_after_sweep_grid_exits():
+    # A forked pool after numba's parallel sweep_grid hung the parent at exit
+    script = textwrap.dedent("""
+        import numpy as np
+        from conftest import _random_ohlc
+        from src.strategy.divergent_sim import run_sweep, simulation_inputs, sweep_grid
+        data = _random_ohlc(500, 1)
+        sweep_grid(*simulation_inputs(data), np.array([2., 6.]), np.array([2, 5]), True, 10_000., .002)
+        run_sweep(data, [{'n_atr': 2.}, {'n_atr': 6.}], n_workers=2)
+    """)
+    tests_dir = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, '-W', 'ignore', '-c', script], check=True, timeout=300,
+                   cwd=os.path.dirname(tests_dir), env={**os.environ, 'PYTHONPATH': tests_dir})
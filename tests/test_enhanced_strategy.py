@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from enhanced_trading_strategy_next_open import backtest_with_details, filtered_entry_signal
+
+
+def _reference_backtest(df, signal_mask, hold_days=3, tp_pct=0.03, trailing_pct=0.005):
+    """The original per-trade loop: (entry row, entry, exit, pnl, outcome) tuples."""
+    df = df.reset_index(drop=True)
+    rows = []
+    for i in range(len(df) - hold_days - 1):
+        if not signal_mask[i] or pd.isna(df.at[i + 1, 'Open']):
+            continue
+        entry_price = df.at[i + 1, 'Open']
+        take_profit = entry_price * (1 + tp_pct)
+        trailing_stop = entry_price * (1 - trailing_pct)
+        max_price = entry_price
+        outcome, exit_price = 'HOLD', entry_price
+        for j in range(1, hold_days + 1):
+            idx = i + 1 + j
+            high, low, close = df.at[idx, 'High'], df.at[idx, 'Low'], df.at[idx, 'Close']
+            max_price = max(max_price, high)
+            trailing_stop = max(trailing_stop, max_price * (1 - trailing_pct))
+            if high >= take_profit:
+                outcome, exit_price = 'TP', take_profit
+                break
+            elif low <= trailing_stop:
+                outcome, exit_price = 'TRAIL_STOP', trailing_stop
+                break
+            elif j == hold_days:
+                outcome, exit_price = 'HOLD', close
+        rows.append((i + 1, entry_price, exit_price, round(exit_price - entry_price, 2), outcome))
+    return rows
+
+
+@pytest.mark.parametrize('hold_days', [1, 3, 5])
+def test_backtest_with_details_matches_loop(make_ohlc, hold_days):
+    df = make_ohlc(1500, 8).reset_index()
+    df['Volume'] = np.random.default_rng(8).integers(1_000, 10_000, len(df)).astype(float)
+    signal = filtered_entry_signal(df, volume_threshold=1.1)
+    result = backtest_with_details(df, signal, hold_days=hold_days, tp_pct=.01, trailing_pct=.01)
+    expected = _reference_backtest(df, signal, hold_days=hold_days, tp_pct=.01, trailing_pct=.01)
+    assert len(expected) > 100
+    assert list(result.index) == [row[0] for row in expected]
+    np.testing.assert_array_equal(result['Entry'], [row[1] for row in expected])
+    np.testing.assert_array_equal(result['Exit'], [row[2] for row in expected])
+    np.testing.assert_array_equal(result['PnL'], [row[3] for row in expected])
+    assert list(result['Outcome']) == [row[4] for row in expected]
+    assert set(result['Outcome']) == {'TP', 'TRAIL_STOP', 'HOLD'}
+
+
+def test_backtest_with_details_zero_hold_days(make_ohlc):
+    # The loop had no bars to hold: HOLD trades exiting at the entry price
+    df = make_ohlc(300, 8).reset_index()
+    signal = np.zeros(len(df), dtype=bool)
+    signal[[5, 40, len(df) - 2, len(df) - 1]] = True
+    result = backtest_with_details(df, signal, hold_days=0)
+    expected = _reference_backtest(df, signal, hold_days=0)
+    assert [row[0] for row in expected] == [6, 41, len(df) - 1]
+    assert list(result.index) == [row[0] for row in expected]
+    np.testing.assert_array_equal(result['Exit'], result['Entry'])
+    np.testing.assert_array_equal(result['PnL'], [row[3] for row in expected])
+    assert list(result['Outcome']) == ['HOLD'] * 3
+
+
+def test_backtest_with_details_rejects_negative_hold_days(make_ohlc):
+    df = make_ohlc(50).reset_index()
+    with pytest.raises(ValueError, match='hold_days'):
+        backtest_with_details(df, np.ones(len(df), dtype=bool), hold_days=-1)
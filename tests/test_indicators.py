@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategy import divergent_bar
+from src.strategy.divergent_bar import _alligator_lines, _awesome_oscillator, _shift, _smas
+
+_sma_backends = pytest.mark.parametrize('use_talib', [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(divergent_bar.talib is None, reason='TA-Lib not installed')),
+])
+
+
+@pytest.mark.parametrize('n, k', [(10, 0), (10, 3), (10, 9), (10, 10), (5, 8), (0, 3)])
+def test_shift_matches_pandas(n, k):
+    values = np.arange(n, dtype=float)
+    expected = pd.Series(values).shift(k).to_numpy()
+    np.testing.assert_array_equal(_shift(values, k), expected)
+
+
+@pytest.mark.parametrize('n', [0, 1, 4, 8, 12, 20])
+def test_short_inputs(make_ohlc, n):
+    df = make_ohlc(n)
+    high, low, close = (df[col].to_numpy() for col in ('High', 'Low', 'Close'))
+    ao = _awesome_oscillator(high, low)
+    assert ao.shape == (n,)
+    assert np.isnan(ao).all()  # shorter than the 34-bar window
+    jaw, teeth, lips = _alligator_lines(close)
+    for line, window, shift in ((jaw, 13, 8), (teeth, 8, 5), (lips, 5, 3)):
+        assert line.shape == (n,)
+        assert np.isnan(line[:min(n, window - 1 + shift)]).all()
+
+
+@_sma_backends
+def test_smas_match_rolling_mean(monkeypatch, make_ohlc, use_talib):
+    monkeypatch.setattr(divergent_bar, 'USE_TALIB', use_talib)
+    close = make_ohlc(3000, 6)['Close']
+    for sma, window in zip(_smas(close.to_numpy(), (34, 13, 8, 5)), (34, 13, 8, 5)):
+        np.testing.assert_allclose(sma, close.rolling(window).mean().to_numpy(), rtol=1e-12)
+
+
+@pytest.mark.skipif(divergent_bar.talib is None, reason='TA-Lib not installed')
+def test_use_talib_is_part_of_the_cache_key(monkeypatch, make_ohlc):
+    df = make_ohlc(2000, 7)
+    high, low = df['High'].to_numpy(), df['Low'].to_numpy()
+    running_sum = _awesome_oscillator(high, low)
+    monkeypatch.setattr(divergent_bar, 'USE_TALIB', True)
+    talib_ao = _awesome_oscillator(high, low)
+    # TA-Lib rounds differently, so a shared cache entry would show up as equality
+    assert not np.array_equal(talib_ao, running_sum, equal_nan=True)
+    np.testing.assert_allclose(talib_ao, running_sum, atol=1e-9)
+    monkeypatch.setattr(divergent_bar, 'USE_TALIB', False)
+    np.testing.assert_array_equal(_awesome_oscillator(high, low), running_sum)
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategy import divergent_bar
+from src.strategy.divergent_bar import (
+    _alligator_lines, _awesome_oscillator, _divergent_conditions, _divergent_signal,
+    _divergent_signal_numexpr, _divergent_signal_numpy, _shift, divergent_signal,
+)
+
+
+def _reference_signal(open_, high, low, close, jaw, teeth, lips, ao):
+    """The original pandas formulation of the divergent bar signal."""
+    jaw, teeth, lips, ao, low, high, close = (
+        pd.Series(a) for a in (jaw, teeth, lips, ao, low, high, close))
+    min_alligator = pd.concat([jaw, teeth, lips], axis=1).min(axis=1)
+    max_alligator = pd.concat([jaw, teeth, lips], axis=1).max(axis=1)
+    local_min = low < pd.concat([low.shift(1), low.shift(2), low.shift(3)], axis=1).min(axis=1)
+    local_max = high > pd.concat([high.shift(1), high.shift(2), high.shift(3)], axis=1).max(axis=1)
+    no_cross = (high < min_alligator) | (low > max_alligator)
+    bullish = (close > (high + low) / 2) & (ao < ao.shift(1)) & local_min & (open_ < close) & no_cross
+    bearish = (close < (high + low) / 2) & (ao > ao.shift(1)) & local_max & (open_ > close) & no_cross
+    return (bullish.astype(np.int8) - bearish.astype(np.int8)).to_numpy()
+
+
+def _reference_indicators(data):
+    """AO and Jaw/Teeth/Lips from the original pandas rolling means."""
+    median_price = (data['High'] + data['Low']) / 2
+    ao = median_price.rolling(5).mean() - median_price.rolling(34).mean()
+    close = data['Close']
+    jaw = close.rolling(13).mean().shift(8)
+    teeth = close.rolling(8).mean().shift(5)
+    lips = close.rolling(5).mean().shift(3)
+    return tuple(a.to_numpy() for a in (jaw, teeth, lips, ao))
+
+
+def _conditions_signal(*arrays):
+    return _divergent_conditions(*arrays)[0]
+
+
+def _inputs(data):
+    open_, high, low, close = (data[col].to_numpy() for col in ('Open', 'High', 'Low', 'Close'))
+    return (open_, high, low, close, *_alligator_lines(close), _awesome_oscillator(high, low))
+
+
+_PATHS = [_divergent_signal, _divergent_signal_numexpr, _divergent_signal_numpy, _conditions_signal]
+
+
+@pytest.mark.parametrize('path', _PATHS, ids=lambda f: f.__name__)
+@pytest.mark.parametrize('n, seed', [(3000, 0), (3000, 1), (200, 2), (40, 3)])
+def test_signal_paths_match_reference(make_ohlc, path, n, seed):
+    inputs = _inputs(make_ohlc(n, seed))
+    expected = _reference_signal(*inputs)
+    signal = path(*inputs)
+    assert signal.dtype == np.int8
+    np.testing.assert_array_equal(signal, expected)
+    if n >= 3000:
+        assert (expected == 1).any() and (expected == -1).any()
+
+
+@pytest.mark.parametrize('path', _PATHS, ids=lambda f: f.__name__)
+@pytest.mark.parametrize('n', [0, 1, 3, 4])
+def test_signal_paths_short_inputs(make_ohlc, path, n):
+    signal = path(*_inputs(make_ohlc(n)))
+    np.testing.assert_array_equal(signal, np.zeros(n, dtype=np.int8))
+
+
+@pytest.mark.parametrize('numba, numexpr', [(True, True), (False, True), (False, False)])
+def test_divergent_bar_indicator_fallbacks(monkeypatch, make_ohlc, numba, numexpr):
+    from src.strategy import divergent_bar
+    if not numba:
+        monkeypatch.setattr(divergent_bar, 'NUMBA_AVAILABLE', False)
+        monkeypatch.setattr(divergent_bar, '_native_divergent_loop', None)
+    if not numexpr:
+        monkeypatch.setattr(divergent_bar, 'numexpr', None)
+    inputs = _inputs(make_ohlc(2000, 4))
+    np.testing.assert_array_equal(divergent_bar.DivergentBar.divergent_bar_indicator(*inputs),
+                                  _reference_signal(*inputs))
+
+
+@pytest.mark.parametrize('use_talib', [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(divergent_bar.talib is None, reason='TA-Lib not installed')),
+])
+# Seeds 0/19/22 have a tie that the SMA backends resolve differently; the
+# /100 series (~$5, cent-rounded) tie far more often
+@pytest.mark.parametrize('seed, scale', [(0, 1), (19, 1), (22, 1), (0, 100), (1, 100)])
+def test_signal_matches_original_formulation(monkeypatch, make_ohlc, use_talib, seed, scale):
+    monkeypatch.setattr(divergent_bar, 'USE_TALIB', use_talib)
+    data = (make_ohlc(3000, seed) / scale).round(2)
+    open_, high, low, close = (data[col].to_numpy() for col in ('Open', 'High', 'Low', 'Close'))
+    jaw, teeth, lips, ao = _reference_indicators(data)
+    expected = _reference_signal(open_, high, low, close, jaw, teeth, lips, ao)
+    signal = divergent_signal(open_, high, low, close)
+    # Only exact ties in real numbers may resolve differently (_smas docstring):
+    # some compared pair must be equal to within rounding at every such bar
+    mismatch = np.flatnonzero(signal != expected)
+    min_alligator = np.fmin(np.fmin(jaw, teeth), lips)
+    max_alligator = np.fmax(np.fmax(jaw, teeth), lips)
+    gaps = np.stack([np.abs(ao - _shift(ao, 1)), np.abs(high - min_alligator), np.abs(low - max_alligator)])
+    assert (np.nanmin(gaps[:, mismatch], axis=0) <= 1e-12 * close[mismatch]).all()
+    assert len(mismatch) <= .05 * np.count_nonzero(expected)
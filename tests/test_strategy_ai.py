@@ -0,0 +1,133 @@
+from dataclasses import asdict
+import numpy as np
+import pandas as pd
+import pytest
+from backtesting import Backtest
+
+from src.strategy import strategy_ai
+from src.strategy.divergent_bar import DivergentBar
+from src.strategy.strategy_ai import (
+    TradeContext, build_condition_diagnostics, build_llm_prompt, extract_context, loads,
+    parse_suggestions,
+)
+
+pytestmark = pytest.mark.filterwarnings('ignore:.*contingent SL/TP order:UserWarning')
+
+
+def _run(data, **params):
+    return Backtest(data, DivergentBar, cash=10_000, commission=.002,
+                    exclusive_orders=True, finalize_trades=True).run(**params)
+
+
+def test_condition_diagnostics_match_pandas(make_ohlc):
+    stats = _run(make_ohlc(3000, 6), store_conditions=True)
+    cm = stats._strategy._cond_matrix
+    np.testing.assert_array_equal(cm['signal'], stats._strategy._signal)
+    diagnostics = build_condition_diagnostics(stats)
+    assert [d['condition'] for d in diagnostics] == [c for c in cm.columns if c != 'signal']
+    for d in diagnostics:
+        series = cm[d['condition']]
+        assert d['pass_rate'] == pytest.approx(series.mean())
+        sig_when_pass = cm.loc[series == 1, 'signal']
+        assert d['signal_rate_given_pass'] == pytest.approx((sig_when_pass != 0).mean())
+
+
+def test_condition_diagnostics_need_store_conditions(make_ohlc):
+    assert build_condition_diagnostics(_run(make_ohlc(500, 6))) == []
+
+
+def _reference_trades(trades):
+    """The original iterrows formulation: (losers, winners) as TradeContexts."""
+    sorted_trades = trades.sort_values('ReturnPct', kind='stable')
+    k = min(5, len(sorted_trades))
+
+    def row_to_ctx(row):
+        return TradeContext(
+            direction='long' if row['Size'] > 0 else 'short',
+            entry_bar=int(row['EntryBar']),
+            exit_bar=int(row['ExitBar']) if not pd.isna(row['ExitBar']) else None,
+            pnl=float(row['PnL']),
+            return_pct=float(row['ReturnPct']),
+            duration=int(row['ExitBar'] - row['EntryBar']) if not pd.isna(row['ExitBar']) else 0,
+            entry_signal_val=float(row.get('Entry_DivergentBar', 0)),
+            exit_signal_val=float(row.get('Exit_DivergentBar', 0)),
+        )
+    return ([row_to_ctx(r) for _, r in sorted_trades.head(k).iterrows()],
+            [row_to_ctx(r) for _, r in sorted_trades.tail(k).iterrows()])
+
+
+def _stats(trades, sharpe=1.2):
+    return {'_trades': trades, '# Trades': len(trades), 'Win Rate [%]': 50., 'Expectancy [%]': .5,
+            'Max. Drawdown [%]': -12.5, 'Sharpe Ratio': sharpe}
+
+
+def _trades(return_pct, exit_bar=None):
+    n = len(return_pct)
+    entry_bar = np.arange(n) * 10
+    return pd.DataFrame({
+        'Size': np.where(np.arange(n) % 2, -3, 4),
+        'EntryBar': entry_bar,
+        'ExitBar': entry_bar + 4 if exit_bar is None else exit_bar,
+        'PnL': np.asarray(return_pct) * 100,
+        'ReturnPct': return_pct,
+    })
+
+
+def test_extract_context_matches_original(make_ohlc):
+    stats = _run(make_ohlc(3000, 6))
+    ctx = extract_context(stats)
+    losers, winners = _reference_trades(stats['_trades'])
+    assert len(losers) == len(winners) == 5
+    assert ctx.top_losers == losers
+    assert ctx.top_winners == winners
+    assert ctx.performance.total_trades == stats['# Trades']
+
+
+def test_extract_context_order_and_open_trades():
+    return_pct = [.03, -.02, .08, -.05, .01, .05, -.01, .02]
+    exit_bar = [4.0, 14.0, np.nan, 34.0, 44.0, 54.0, 64.0, 74.0]  # trade 2 still open
+    ctx = extract_context(_stats(_trades(return_pct, exit_bar)))
+    # Worst first among losers, best last among winners (ascending, like a full sort)
+    assert [t.return_pct for t in ctx.top_losers] == [-.05, -.02, -.01, .01, .02]
+    assert [t.return_pct for t in ctx.top_winners] == [.01, .02, .03, .05, .08]
+    open_trade = ctx.top_winners[-1]
+    assert (open_trade.entry_bar, open_trade.exit_bar, open_trade.duration) == (20, None, 0)
+    assert ctx.top_losers[0] == TradeContext('short', 30, 34, -5., -.05, 4, 0., 0.)
+
+
+@pytest.mark.parametrize('n', [0, 1, 3])
+def test_extract_context_fewer_than_five_trades(n):
+    return_pct = [.02, -.01, .04][:n]
+    ctx = extract_context(_stats(_trades(return_pct)))
+    assert [t.return_pct for t in ctx.top_losers] == sorted(return_pct)
+    assert [t.return_pct for t in ctx.top_winners] == sorted(return_pct)
+
+
+@pytest.mark.skipif(strategy_ai.orjson is None, reason='orjson not installed')
+def test_build_llm_prompt_writes_nan_as_null():
+    ctx = extract_context(_stats(_trades([.01, -.02]), sharpe=float('nan')))
+    prompt = build_llm_prompt(ctx)
+    start = prompt.index('JSON Context:\n') + len('JSON Context:\n')
+    end = prompt.index('\nSchema example for your response:')
+    context = loads(prompt[start:end])
+    assert context['performance']['sharpe'] is None
+    assert context == {**asdict(ctx), 'performance': {**asdict(ctx.performance), 'sharpe': None}}
+    assert prompt.endswith(strategy_ai.dumps(strategy_ai.SUGGESTION_SCHEMA_EXAMPLE))
+
+
+def test_parse_suggestions():
+    raw = """[
+        {"change": "  Require AO < 0 for longs ", "rationale": "fewer fades", "implementation_hint": "ao < 0"},
+        {"rationale": "no change key"},
+        "not a dict",
+        {"change": "Widen trail", "implementation_hint": 3}
+    ]"""
+    assert parse_suggestions(raw) == [
+        {'change': 'Require AO < 0 for longs', 'rationale': 'fewer fades', 'implementation_hint': 'ao < 0'},
+        {'change': 'Widen trail', 'rationale': '', 'implementation_hint': '3'},
+    ]
+
+
+@pytest.mark.parametrize('raw', ['not json', '{"change": "x"}', '', '[1, 2]'])
+def test_parse_suggestions_rejects_non_lists(raw):
+    assert parse_suggestions(raw) == []